@@ -10,10 +10,21 @@ import os
 import sys
 import asyncio
 import re
+import hashlib
+import heapq
+import json
+import pickle
+import socket
+import struct
+import sqlite3
 import argparse
+import logging
 import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple, Union
 from pathlib import Path
 
 # Third-party imports
@@ -21,11 +32,23 @@ from telethon import TelegramClient, events, utils
 from telethon.tl.types import (MessageMediaPhoto, MessageMediaDocument, 
                                MessageMediaWebPage, InputMessagesFilterPhotos,
                                InputMessagesFilterDocument, InputMessagesFilterUrl,
-                               InputMessagesFilterGif, Message)
+                               InputMessagesFilterGif, InputMessagesFilterPhotoVideo,
+                               InputMessagesFilterMusic, InputMessagesFilterRoundVoice,
+                               Message)
 from telethon.tl.functions.messages import GetHistoryRequest
-from telethon.errors import SessionPasswordNeededError
+from telethon.errors import (SessionPasswordNeededError, FileReferenceExpiredError,
+                             FilerefUpgradeNeededError)
 from dotenv import load_dotenv
 from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
+
+# Optional: RE2 matches in linear time without backtracking
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+log = logging.getLogger('tgdl')
 
 # Load environment variables from .env.local
 load_dotenv('.env.local')
@@ -38,6 +61,189 @@ PHONE_NUMBER = os.getenv('TELEGRAM_PHONE_NUMBER')
 # Default download directory
 DEFAULT_DOWNLOAD_DIR = 'downloads'
 
+# Default number of concurrent downloads
+DEFAULT_WORKERS = 4
+
+# Default Unix socket of the --daemon mode, next to the session file
+DEFAULT_SOCKET_PATH = 'telegram_downloader.sock'
+
+# Large documents are fetched as this many ranges in parallel, each
+# requested from Telegram in chunks of PART_REQUEST_SIZE bytes
+PARALLEL_PARTS = 4
+PART_REQUEST_SIZE = 512 * 1024
+
+# URLs in message text: scheme followed by any run of URL-safe characters
+_URL_RE = (re2 or re).compile(r"https?://[A-Za-z0-9$%&'()*+,\-./:;<=>?@\[\]^_!]+")
+
+# Number of buffered link lines that triggers a write to the links file
+LINKS_FLUSH_LINES = 1000
+
+# Number of messages whose text is scanned for URLs in one worker process call
+URL_BATCH_SIZE = 200
+
+# Media types downloaded as files; compared with `type(...) in` since Telethon
+# doesn't subclass them
+DOWNLOADABLE_MEDIA = (MessageMediaPhoto, MessageMediaDocument)
+
+# Server-side filters whose union covers every message 'all' can use:
+# photos, videos, files, GIFs, audio, voice/round messages and URLs
+ALL_MEDIA_FILTERS = (InputMessagesFilterPhotoVideo, InputMessagesFilterDocument,
+                     InputMessagesFilterGif, InputMessagesFilterMusic,
+                     InputMessagesFilterRoundVoice, InputMessagesFilterUrl)
+
+# Name of the manifest of downloaded media kept in the download directory
+MANIFEST_NAME = '.manifest.sqlite'
+
+# Resolved entities (display name and input peer) kept between runs
+ENTITY_CACHE_PATH = (Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache')
+                     / 'telegram_downloader' / 'entities.pkl')
+
+
+def _extract_urls_batch(texts: List[str]) -> List[List[str]]:
+    """
+    Extract the URLs from a batch of message texts.
+    
+    Args:
+        texts: Message texts to scan
+        
+    Returns:
+        List of the URLs found in each text, in the same order
+    """
+    return [_URL_RE.findall(text) for text in texts]
+
+
+async def _merge_by_id(streams: List[AsyncIterator[Message]],
+                      limit: Optional[int] = None) -> AsyncIterator[Message]:
+    """
+    Merge newest-first message streams into one newest-first stream.
+    
+    Messages present in several streams are yielded only once.
+    
+    Args:
+        streams: Message iterators, each ordered by descending message ID
+        limit: Maximum number of messages to yield (None for unlimited)
+        
+    Yields:
+        Messages from all streams, by descending message ID
+    """
+    async def _next(stream: AsyncIterator[Message]) -> Optional[Message]:
+        try:
+            return await stream.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    # Fetch the first page of every stream concurrently
+    heads = await asyncio.gather(*(_next(stream) for stream in streams))
+    heap = [(-message.id, i, message) for i, message in enumerate(heads) if message is not None]
+    heapq.heapify(heap)
+    
+    count = 0
+    last_id = None
+    while heap and (limit is None or count < limit):
+        _, i, message = heapq.heappop(heap)
+        if message.id != last_id:
+            last_id = message.id
+            count += 1
+            yield message
+        
+        following = await _next(streams[i])
+        if following is not None:
+            heapq.heappush(heap, (-following.id, i, following))
+
+
+def _positive_int(value: str) -> int:
+    """
+    Parse a command line value that must be a whole number of at least 1.
+    
+    Args:
+        value: Value given on the command line
+        
+    Returns:
+        The parsed number
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def _peer_is_same_user(writer: asyncio.StreamWriter) -> bool:
+    """
+    Check that the process on the other end of a Unix socket runs as our user.
+    
+    Where SO_PEERCRED isn't available the socket's file permissions are
+    relied on instead.
+    
+    Args:
+        writer: Writer of the accepted connection
+        
+    Returns:
+        True if the peer may send commands
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return True
+    
+    sock = writer.get_extra_info('socket')
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', creds)
+    return uid == os.getuid()
+
+
+async def _send_to_daemon(socket_path: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Send a command to a running --daemon instance.
+    
+    Args:
+        socket_path: Unix socket the daemon listens on
+        request: Command to send
+        
+    Returns:
+        The daemon's response, or None if no daemon is listening
+    """
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    
+    try:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    except OSError:
+        # Stale socket left by a daemon that is no longer running
+        return None
+    
+    try:
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        response = await reader.readline()
+    except ConnectionError:
+        # The daemon hung up, e.g. because it rejected us
+        response = b''
+    finally:
+        writer.close()
+    
+    return json.loads(response) if response else {'ok': False, 'error': 'connection closed by daemon'}
+
+
+def _sha256_file(path: str) -> bytes:
+    """
+    Compute the SHA256 digest of a file.
+    
+    Args:
+        path: Path of the file to hash
+        
+    Returns:
+        Raw SHA256 digest
+    """
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+
+            return hashlib.file_digest(f, 'sha256').digest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+        return digest.digest()
+
+
 class TelegramDownloader:
     def __init__(self, api_id: str, api_hash: str, phone: str, download_dir: str = DEFAULT_DOWNLOAD_DIR):
         """
@@ -53,7 +259,14 @@ class TelegramDownloader:
         self.api_hash = api_hash
         self.phone = phone
         self.download_dir = download_dir
-        self.client = TelegramClient('telegram_downloader_session', api_id, api_hash)
+        # Live updates aren't needed, and retrying/sleeping through flood waits
+        # keeps concurrent downloads going instead of failing them
+        self.client = TelegramClient('telegram_downloader_session', api_id, api_hash,
+                                     connection_retries=5, request_retries=5,
+                                     flood_sleep_threshold=120, receive_updates=False)
+        self._manifest: Optional[sqlite3.Connection] = None
+        self._cpu: Optional[ProcessPoolExecutor] = None
+        self._entity_cache: Optional[Dict[Any, Any]] = None
         
     async def connect(self) -> None:
         """
@@ -78,36 +291,51 @@ class TelegramDownloader:
         """
         Get a list of all dialogs (chats/groups) the user is part of.
         
+        Prefer list_dialogs for display, which doesn't hold the whole list.
+        
         Returns:
             List of dialog information dictionaries
         """
-        dialogs = await self.client.get_dialogs()
         return [
             {
                 'id': dialog.id,
                 'name': dialog.name,
-                'type': 'Group' if dialog.is_group else 'Channel' if dialog.is_channel else 'Private'
+                'type': self._dialog_type(dialog)
             }
-            for dialog in dialogs
+            async for dialog in self.client.iter_dialogs()
         ]
     
+    @staticmethod
+    def _dialog_type(dialog: Any) -> str:
+        """
+        Get a human readable type for a dialog.
+        
+        Args:
+            dialog: Telethon dialog
+            
+        Returns:
+            'Group', 'Channel' or 'Private'
+        """
+        return 'Group' if dialog.is_group else 'Channel' if dialog.is_channel else 'Private'
+    
     async def list_dialogs(self) -> None:
         """
         Display a list of all dialogs (chats/groups) the user is part of.
         """
-        dialogs = await self.get_dialogs()
-        
         print("\nAvailable Telegram Groups/Channels:")
         print("-" * 60)
         print(f"{'Index':<6} {'ID':<12} {'Type':<10} {'Name':<30}")
         print("-" * 60)
         
-        for i, dialog in enumerate(dialogs, 1):
-            print(f"{i:<6} {dialog['id']:<12} {dialog['type']:<10} {dialog['name']:<30}")
+        # Print dialogs as they arrive rather than collecting them all first
+        i = 0
+        async for dialog in self.client.iter_dialogs():
+            i += 1
+            print(f"{i:<6} {dialog.id:<12} {self._dialog_type(dialog):<10} {dialog.name:<30}")
     
     async def download_media(self, entity_id: int, media_type: str = 'all', 
                           limit: Optional[int] = 100, offset_date: Optional[datetime] = None,
-                          contains: Optional[str] = None) -> None:
+                          contains: Optional[str] = None, workers: int = DEFAULT_WORKERS) -> None:
         """
         Download media from a specific chat/group.
         
@@ -116,15 +344,29 @@ class TelegramDownloader:
             media_type: Type of media to download ('all', 'photos', 'documents', 'links', 'gifs')
             limit: Maximum number of messages to process (None for unlimited)
             offset_date: Only download media after this date
-            contains: Only download media from messages containing this text
+            contains: Only download media from messages Telegram's search matches for
+                this text (whole words or word prefixes) that also contain it
+            workers: Maximum number of concurrent downloads
         """
-        entity = await self.client.get_entity(entity_id)
-        entity_name = utils.get_display_name(entity)
+        entity, entity_name = await self._resolve_entity(entity_id)
         
         # Create download directory for this entity
         entity_dir = Path(self.download_dir) / f"{entity_name}_{entity_id}"
         entity_dir.mkdir(parents=True, exist_ok=True)
         
+        # List the directory once instead of stat()ing every candidate file
+        existing_names = set(os.listdir(entity_dir))
+        
+        # Plain string prefix for target paths, so the per-message code doesn't build Path objects
+        entity_dir_str = os.fspath(entity_dir) + os.sep
+        entity_dir_abs = os.path.abspath(entity_dir)
+        
+        self._open_manifest()
+        
+        # Regex matching and hashing run in worker processes, away from the event loop
+        if self._cpu is None:
+            self._cpu = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+        
         print(f"\nDownloading {media_type} from {entity_name}")
         print(f"Saving to: {entity_dir}")
         
@@ -140,104 +382,605 @@ class TelegramDownloader:
         else:  # 'all'
             filter_type = None
         
-        # Get messages with the specified filter
-        messages = await self.client.get_messages(
-            entity,
-            limit=limit,
-            offset_date=offset_date,
-            filter=filter_type
-        )
-        
-        # Filter messages by content if specified
-        if contains:
-            messages = [msg for msg in messages if msg.text and contains.lower() in msg.text.lower()]
-        
-        if not messages:
-            print("No matching messages found.")
-            return
-        
-        print(f"Found {len(messages)} messages to process.")
-        
         # Download media from messages
-        downloaded_count = 0
-        skipped_count = 0
+        stats = Counter()
         links_file = None
-        total_bytes = 0
         start_time = time.time()
         
         if media_type == 'links' or media_type == 'all':
-            links_file = open(entity_dir / 'extracted_links.txt', 'w', encoding='utf-8')
+            links_file = open(entity_dir / 'extracted_links.txt', 'w', buffering=1 << 20, encoding='utf-8')
         
         # Create a progress bar with bright green color
-        progress_bar = tqdm(messages, desc="Downloading", colour='green')
+        progress_bar = tqdm(total=limit, desc="Downloading", colour='green')
         
-        for message in progress_bar:
-            try:
-                # Handle different media types
-                if message.media:
-                    if isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument)):
-                        # Download photos and documents
-                        if media_type in ['all', 'photos', 'documents', 'gifs']:
-                            # Get the filename without downloading
-                            attributes = getattr(message.media, 'document', None)
-                            file_size = getattr(attributes, 'size', 0) if attributes else 0
-                            
-                            if attributes and hasattr(attributes, 'attributes'):
-                                for attr in attributes.attributes:
-                                    if hasattr(attr, 'file_name') and attr.file_name:
-                                        potential_path = entity_dir / attr.file_name
-                                        if potential_path.exists():
-                                            progress_bar.write(f"Skipping existing file: {attr.file_name}")
-                                            skipped_count += 1
-                                            continue
-                            
-                            # Download if file doesn't exist
-                            before_size = total_bytes
-                            filename = await self.client.download_media(message, entity_dir)
-                            if filename:
-                                downloaded_count += 1
-                                total_bytes += file_size
-                                
-                                # Calculate and display download speed
-                                elapsed = time.time() - start_time
-                                if elapsed > 0:
-                                    speed_mbps = (total_bytes * 8) / (elapsed * 1_000_000)
-                                    progress_bar.set_postfix({"Speed": f"{speed_mbps:.2f} Mbps", "Downloaded": f"{downloaded_count}"})
-                    
-                    elif isinstance(message.media, MessageMediaWebPage) and message.media.webpage.url:
-                        # Extract links from web pages
-                        if media_type in ['all', 'links'] and links_file:
-                            links_file.write(f"{message.media.webpage.url}\n")
-                            downloaded_count += 1
+        async def _download(message: Message) -> None:
+            """
+            Download a message's photo or document unless it was downloaded before.
+            
+            Args:
+                message: Message containing a photo or document
+            """
+            # Get the filename without downloading
+            attributes = getattr(message.media, 'document', None)
+            file_size = getattr(attributes, 'size', 0) if attributes else 0
+            
+            file_name = self._target_name(message)
+            if file_name in existing_names:
+                log.debug("Skipping existing file: %s", file_name)
+                stats['skipped'] += 1
+                return
+            
+            # Skip media downloaded before under another name, and hardlink
+            # media downloaded for another group instead of fetching it again
+            media_id = self._media_id(message.media)
+            known_path = self._manifest_lookup(media_id)
+            filename = entity_dir_str + file_name
+            if known_path and os.path.exists(known_path):
+                if os.path.dirname(known_path) == entity_dir_abs:
+                    log.debug("Skipping already downloaded media: %s", known_path)
+                    stats['skipped'] += 1
+                    return
                 
-                # Extract URLs from message text
-                if message.text and (media_type in ['all', 'links']) and links_file:
-                    urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', message.text)
-                    for url in urls:
-                        links_file.write(f"{url}\n")
-                        downloaded_count += 1
+                existing_names.add(file_name)
+                try:
+                    os.link(known_path, filename)
+                except OSError:
+                    # Different filesystem or no hardlink support; download it
+                    existing_names.discard(file_name)
+                else:
+                    log.debug("Linked %s to %s", filename, known_path)
+                    self._manifest_move(media_id, filename)
+                    stats['linked'] += 1
+                    return
+            
+            # Download if file doesn't exist, claiming the name so concurrent
+            # tasks skip it. Data goes to a .part file that is only renamed
+            # once complete, so an interrupted download is never mistaken
+            # for a finished one.
+            existing_names.add(file_name)
+            part_filename = filename + '.part'
+            try:
+                if self._can_download_in_parts(message):
+                    try:
+                        downloaded = await self._parallel_download(message, part_filename)
+                    except (FileReferenceExpiredError, FilerefUpgradeNeededError):
+                        # Unlike iter_download, download_media refreshes the file reference
+                        downloaded = await self.client.download_media(message, part_filename)
+                else:
+                    downloaded = await self.client.download_media(message, part_filename)
+            except BaseException:
+                existing_names.discard(file_name)
+                raise
+            
+            if not downloaded:
+                existing_names.discard(file_name)
+                return
+            
+            os.replace(part_filename, filename)
+            await self._manifest_record(media_id, filename)
+            stats['downloaded'] += 1
+            stats['bytes'] += file_size
+            
+            # Calculate and display download speed
+            elapsed = time.time() - start_time
+            if elapsed > 0:
+                speed_mbps = (stats['bytes'] * 8) / (elapsed * 1_000_000)
+                progress_bar.set_postfix({"Speed": f"{speed_mbps:.2f} Mbps", "Downloaded": f"{stats['downloaded']}"})
+        
+        async def _save_links(message: Message, urls: List[str]) -> None:
+            """
+            Buffer the links of a message for the links file.
+            
+            Args:
+                message: Message to take the web page preview URL from
+                urls: URLs already extracted from the message text
+            """
+            # Ordered set: a preview URL is usually also in the text
+            message_urls = {}
+            if type(message.media) is MessageMediaWebPage:
+                url = getattr(message.media.webpage, 'url', None)
+                if url:
+                    message_urls[url] = None
+            if urls:
+                message_urls.update(dict.fromkeys(urls))
+            
+            # Buffer each unique link once, writing in batches off the event loop
+            if message_urls:
+                links_buf.extend(url + '\n' for url in message_urls)
+                stats['downloaded'] += len(message_urls)
+                if len(links_buf) >= LINKS_FLUSH_LINES:
+                    await _flush_links()
+        
+        # media_type is fixed for the whole run, so pick a handler specialized
+        # for it once instead of re-checking it for every message
+        async def _process_media_only(message: Message, urls: List[str]) -> None:
+            if type(message.media) in DOWNLOADABLE_MEDIA:
+                await _download(message)
+        
+        async def _process_links_only(message: Message, urls: List[str]) -> None:
+            await _save_links(message, urls)
+        
+        async def _process_all(message: Message, urls: List[str]) -> None:
+            if type(message.media) in DOWNLOADABLE_MEDIA:
+                await _download(message)
+            await _save_links(message, urls)
+        
+        if media_type == 'all':
+            process = _process_all
+        elif media_type == 'links':
+            process = _process_links_only
+        else:
+            process = _process_media_only
+        
+        async def _process_one(message: Message, urls: List[str]) -> None:
+            """
+            Process a single message, releasing its semaphore slot when done.
+            
+            Args:
+                message: Message to process
+                urls: URLs already extracted from the message text
+            """
+            try:
+                await process(message, urls)
             
             except Exception as e:
-                progress_bar.write(f"Error processing message: {e}")
+                log.warning("Error processing message: %s", e)
+            
+            finally:
+                sem.release()
+                progress_bar.update(1)
+        
+        # Serializes writes to links_file, which isn't safe to share between threads
+        links_lock = asyncio.Lock()
+        links_buf = []
+        
+        async def _flush_links() -> None:
+            # Take the buffered lines before awaiting so other tasks can keep appending
+            lines = links_buf[:]
+            links_buf.clear()
+            async with links_lock:
+                # A cancelled task still lets its write finish, so the lines
+                # aren't lost and the file isn't closed while being written
+                write = asyncio.ensure_future(asyncio.to_thread(links_file.writelines, lines))
+                try:
+                    await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    await write
+                    raise
+        
+        # Overlap the (latency-bound) transfers, at most `workers` messages at a time
+        sem = asyncio.Semaphore(workers)
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        
+        async def _schedule(batch: List[Message]) -> None:
+            # Extract URLs for the whole batch in one round trip to a worker process.
+            # Media-only handlers never look at URLs, so they all share one empty tuple.
+            if process is _process_media_only:
+                urls_per_message = repeat(())
+            else:
+                texts = [message.text or '' for message in batch]
+                urls_per_message = await loop.run_in_executor(self._cpu, _extract_urls_batch, texts)
+            
+            # Wait for a free slot before each task so pending messages stay bounded
+            for message, urls in zip(batch, urls_per_message):
+                await sem.acquire()
+                task = asyncio.create_task(_process_one(message, urls))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        
+        # Stream messages with the specified filter, so downloads start while
+        # later pages are still being fetched. `contains` is searched server-side.
+        if filter_type is None and not contains and limit is None:
+            # Rather than the whole history, fetch only messages with media or URLs.
+            # Each filter is a separate (more rate-limited) search that may return
+            # up to `limit` messages, so with a limit one history request is cheaper.
+            message_stream = _merge_by_id([
+                self.client.iter_messages(entity, limit=limit, offset_date=offset_date, filter=message_filter())
+                for message_filter in ALL_MEDIA_FILTERS
+            ], limit=limit)
+        else:
+            message_stream = self.client.iter_messages(
+                entity,
+                limit=limit,
+                offset_date=offset_date,
+                filter=filter_type,
+                search=contains
+            )
+        
+        try:
+            batch = []
+            async for message in message_stream:
+                # Telegram's search is word/prefix based, so text inside a word is
+                # never found. This check only drops server hits that don't contain
+                # the exact text (e.g. other word forms Telegram also matches).
+                if contains and not (message.text and contains.lower() in message.text.lower()):
+                    continue
+                
+                stats['messages'] += 1
+                batch.append(message)
+                if len(batch) == URL_BATCH_SIZE:
+                    await _schedule(batch)
+                    batch = []
+            
+            if batch:
+                await _schedule(batch)
+            
+            await asyncio.gather(*tasks, return_exceptions=True)
         
-        if links_file:
-            links_file.close()
+        except BaseException:
+            # Don't leave downloads running after the caller has seen the error
+            pending = list(tasks)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+        
+        finally:
+            progress_bar.close()
+            
+            # Keep the links extracted so far even when the run was aborted
+            if links_file:
+                await _flush_links()
+                await asyncio.to_thread(links_file.close)
+        
+        if not stats['messages']:
+            print("No matching messages found.")
+            return
+        
+        print(f"Processed {stats['messages']} messages.")
         
         # Calculate final download speed
         total_elapsed = time.time() - start_time
-        if total_elapsed > 0 and total_bytes > 0:
-            final_speed_mbps = (total_bytes * 8) / (total_elapsed * 1_000_000)
+        if total_elapsed > 0 and stats['bytes'] > 0:
+            final_speed_mbps = (stats['bytes'] * 8) / (total_elapsed * 1_000_000)
             print(f"\nAverage download speed: {final_speed_mbps:.2f} Mbps")
-            print(f"Total data downloaded: {total_bytes / (1024*1024):.2f} MB")
+            print(f"Total data downloaded: {stats['bytes'] / (1024*1024):.2f} MB")
+        
+        print(f"Downloaded/extracted {stats['downloaded']} items from {entity_name}.")
+        if stats['skipped'] > 0:
+            print(f"Skipped {stats['skipped']} already existing files.")
+        if stats['linked'] > 0:
+            print(f"Linked {stats['linked']} files already downloaded for other groups.")
+
+    async def _resolve_entity(self, entity_id: int) -> Tuple[Any, str]:
+        """
+        Resolve a chat/group ID, using the on-disk entity cache when possible.
+        
+        The cached input peer can be passed straight to Telethon, which saves
+        the get_entity round trip on every run after the first.
+        
+        Args:
+            entity_id: ID of the chat/group
+            
+        Returns:
+            Tuple of the input peer and the display name of the entity
+        """
+        if self._entity_cache is None:
+            try:
+                with open(ENTITY_CACHE_PATH, 'rb') as f:
+                    self._entity_cache = pickle.load(f)
+            except Exception:
+                # Missing, corrupt, or pickled by a Telethon version whose classes
+                # moved; it's only a cache, so start over
+                self._entity_cache = {}
+        
+        # Access hashes are only valid for the account that obtained them
+        key = (self.phone, entity_id)
+        if key in self._entity_cache:
+            entity_name, input_peer = self._entity_cache[key]
+            return input_peer, entity_name
+        
+        entity = await self.client.get_entity(entity_id)
+        entity_name = utils.get_display_name(entity)
+        input_peer = utils.get_input_peer(entity)
+        self._entity_cache[key] = (entity_name, input_peer)
+        
+        try:
+            ENTITY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = ENTITY_CACHE_PATH.with_suffix('.tmp')
+            with open(temp_path, 'wb') as f:
+                pickle.dump(self._entity_cache, f)
+            os.replace(temp_path, ENTITY_CACHE_PATH)
+        except OSError as e:
+            log.warning("Could not save entity cache: %s", e)
+        
+        return input_peer, entity_name
+    
+    @classmethod
+    def _target_name(cls, message: Message) -> str:
+        """
+        Decide the local filename for a message's photo or document.
+        
+        Named documents keep their name. Other media is named after its kind,
+        the message date and the media ID, so the name is unique and known
+        before downloading.
+        
+        Args:
+            message: Message containing a photo or document
+            
+        Returns:
+            Filename (without directory) to save the media as
+        """
+        document = getattr(message.media, 'document', None)
+        for attr in getattr(document, 'attributes', None) or []:
+            if getattr(attr, 'file_name', None):
+                return os.path.basename(attr.file_name)
+        
+        kind = 'document' if document else 'photo'
+        date = message.date.strftime('%Y-%m-%d_%H-%M-%S')
+        return f"{kind}_{date}_{cls._media_id(message.media)}{utils.get_extension(message.media)}"
+    
+    @staticmethod
+    def _can_download_in_parts(message: Message) -> bool:
+        """
+        Check whether a message's media is worth fetching as parallel ranges.
+        
+        Only documents large enough to give every part at least one request
+        qualify; everything else goes through download_media.
+        
+        Args:
+            message: Message whose media would be downloaded
+            
+        Returns:
+            True if _parallel_download can be used for this message
+        """
+        if not hasattr(os, 'pwrite') or not isinstance(message.media, MessageMediaDocument):
+            return False
+        
+        document = message.media.document
+        return bool(document) and document.size >= PARALLEL_PARTS * PART_REQUEST_SIZE
+    
+    async def _parallel_download(self, message: Message, path: str,
+                                 parts: int = PARALLEL_PARTS) -> str:
+        """
+        Download a document as several byte ranges fetched concurrently.
+        
+        The file is preallocated and every range writes its chunks at their
+        own offsets, so the ranges never share a file cursor.
         
-        print(f"Downloaded/extracted {downloaded_count} items from {entity_name}.")
-        if skipped_count > 0:
-            print(f"Skipped {skipped_count} already existing files.")
+        Args:
+            message: Message containing the document to download
+            path: Path to save the file to
+            parts: Number of ranges to fetch concurrently
+            
+        Returns:
+            Path of the downloaded file
+        """
+        document = message.media.document
+        size = document.size
+        
+        # Split the file into contiguous ranges of whole requests
+        total_chunks = -(-size // PART_REQUEST_SIZE)
+        chunks_per_part = -(-total_chunks // parts)
+        
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            
+            async def fetch_range(first_chunk: int) -> None:
+                offset = first_chunk * PART_REQUEST_SIZE
+                async for chunk in self.client.iter_download(
+                        document, offset=offset, limit=chunks_per_part,
+                        request_size=PART_REQUEST_SIZE, file_size=size):
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+            
+            tasks = [asyncio.create_task(fetch_range(first_chunk))
+                     for first_chunk in range(0, total_chunks, chunks_per_part)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # Don't leave ranges writing to a closed descriptor
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        finally:
+            os.close(fd)
+        
+        return path
+
+    def _open_manifest(self) -> None:
+        """
+        Open (creating if needed) the manifest of downloaded media.
+        
+        The manifest maps Telegram media IDs to the local file and its SHA256,
+        so media is not downloaded twice and identical files are hardlinked.
+        """
+        if self._manifest is not None:
+            return
+        
+        Path(self.download_dir).mkdir(parents=True, exist_ok=True)
+        self._manifest = sqlite3.connect(str(Path(self.download_dir) / MANIFEST_NAME))
+        self._manifest.execute(
+            'CREATE TABLE IF NOT EXISTS manifest (media_id INTEGER PRIMARY KEY, sha256 BLOB, path TEXT)')
+        self._manifest.execute(
+            'CREATE INDEX IF NOT EXISTS manifest_sha256 ON manifest (sha256)')
+        self._manifest.commit()
+    
+    @staticmethod
+    def _media_id(media: Any) -> Optional[int]:
+        """
+        Get the Telegram ID of the photo or document in a message's media.
+        
+        Args:
+            media: Media of a message
+            
+        Returns:
+            ID of the photo or document, or None if there is none
+        """
+        file = getattr(media, 'document', None) or getattr(media, 'photo', None)
+        return getattr(file, 'id', None)
+    
+    def _manifest_lookup(self, media_id: Optional[int]) -> Optional[str]:
+        """
+        Find where a media file was previously downloaded to.
+        
+        Args:
+            media_id: Telegram ID of the photo or document
+            
+        Returns:
+            Path recorded for the media, or None if it was never downloaded
+        """
+        if media_id is None:
+            return None
+        
+        row = self._manifest.execute(
+            'SELECT path FROM manifest WHERE media_id = ?', (media_id,)).fetchone()
+        return row[0] if row else None
+    
+    def _manifest_move(self, media_id: int, path: str) -> None:
+        """
+        Point a manifest entry at another copy of the same file.
+        
+        Args:
+            media_id: Telegram ID of the photo or document
+            path: Path of the new copy
+        """
+        self._manifest.execute(
+            'UPDATE manifest SET path = ? WHERE media_id = ?', (os.path.abspath(path), media_id))
+        self._manifest.commit()
+    
+    async def _manifest_record(self, media_id: Optional[int], path: str) -> None:
+        """
+        Record a finished download in the manifest.
+        
+        If a file with the same content was already downloaded, the new copy
+        is replaced by a hardlink to it.
+        
+        Args:
+            media_id: Telegram ID of the photo or document
+            path: Path the media was downloaded to
+        """
+        if media_id is None:
+            return
+        
+        path = os.path.abspath(path)
+        sha256 = await asyncio.get_running_loop().run_in_executor(self._cpu, _sha256_file, path)
+        
+        row = self._manifest.execute(
+            'SELECT path FROM manifest WHERE sha256 = ? AND path != ?', (sha256, path)).fetchone()
+        if row and os.path.exists(row[0]):
+            link_path = path + '.link'
+            try:
+                os.link(row[0], link_path)
+                os.replace(link_path, path)
+            except OSError:
+                # Different filesystem or no hardlink support; keep the copy
+                pass
+        
+        self._manifest.execute(
+            'INSERT OR REPLACE INTO manifest (media_id, sha256, path) VALUES (?, ?, ?)',
+            (media_id, sha256, path))
+        self._manifest.commit()
+
+    async def serve(self, socket_path: str = DEFAULT_SOCKET_PATH) -> None:
+        """
+        Keep the client connected and run download commands sent over a Unix socket.
+        
+        Each connection sends one JSON line such as
+        {"cmd": "download", "entity_id": 123, "media_type": "photos"} and gets one
+        JSON line back once the command finished. Downloads run one at a time.
+        
+        Args:
+            socket_path: Path of the Unix socket to listen on
+        """
+        lock = asyncio.Lock()
+        
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            try:
+                if not _peer_is_same_user(writer):
+                    log.warning("Rejected connection from another user")
+                    return
+                
+                try:
+                    request = json.loads(await reader.readline())
+                    workers = request.get('workers', DEFAULT_WORKERS)
+                    if request.get('cmd') != 'download':
+                        response = {'ok': False, 'error': f"Unknown command: {request.get('cmd')}"}
+                    elif not isinstance(workers, int) or isinstance(workers, bool) or workers < 1:
+                        response = {'ok': False, 'error': f"workers must be at least 1, got {workers!r}"}
+                    else:
+                        offset_date = None
+                        if request.get('days'):
+                            offset_date = datetime.now() - timedelta(days=request['days'])
+                        
+                        async with lock:
+                            await self._serve_download(request, offset_date, workers)
+                        response = {'ok': True}
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+            finally:
+                writer.close()
+        
+        server = await asyncio.start_unix_server(handle, path=socket_path)
+        os.chmod(socket_path, 0o600)
+        print(f"Listening for download commands on {socket_path}")
+        
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def _serve_download(self, request: Dict[str, Any], offset_date: Optional[datetime],
+                              workers: int) -> None:
+        """
+        Run a download command received by serve with the client's settings.
+        
+        The command's download directory and verbosity only apply to this
+        download; the daemon's own settings are restored afterwards.
+        
+        Args:
+            request: Download command sent by the client
+            offset_date: Only download media after this date
+            workers: Maximum number of concurrent downloads
+        """
+        daemon_download_dir = self.download_dir
+        daemon_log_level = log.level
+        download_dir = request.get('download_dir') or daemon_download_dir
+        other_dir = os.path.abspath(download_dir) != os.path.abspath(daemon_download_dir)
+        
+        # The manifest belongs to a download directory, so reopen it for another one
+        if other_dir and self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+        self.download_dir = download_dir
+        if request.get('verbose'):
+            log.setLevel(logging.DEBUG)
+        
+        try:
+            with logging_redirect_tqdm():
+                await self.download_media(
+                    entity_id=request['entity_id'],
+                    media_type=request.get('media_type', 'all'),
+                    limit=request.get('limit', 100),
+                    offset_date=offset_date,
+                    contains=request.get('contains'),
+                    workers=workers
+                )
+        finally:
+            log.setLevel(daemon_log_level)
+            if other_dir and self._manifest is not None:
+                self._manifest.close()
+                self._manifest = None
+            self.download_dir = daemon_download_dir
 
     async def close(self) -> None:
         """
         Disconnect from Telegram.
         """
+        if self._manifest is not None:
+            self._manifest.close()
+            self._manifest = None
+        if self._cpu is not None:
+            self._cpu.shutdown()
+            self._cpu = None
         await self.client.disconnect()
 
 async def main():
@@ -250,12 +993,46 @@ async def main():
                         default='all', help='Type of media to download')
     parser.add_argument('--limit', type=int, default=100, help='Maximum number of messages to process (0 for unlimited)')
     parser.add_argument('--days', type=int, help='Only download media from the last N days')
-    parser.add_argument('--contains', type=str, help='Only download media from messages containing this text')
+    parser.add_argument('--contains', type=str,
+                        help='Only download media from messages matching this text in a Telegram search '
+                             '(whole words or word prefixes, case-insensitive)')
     parser.add_argument('--download-dir', type=str, default=DEFAULT_DOWNLOAD_DIR, 
                         help='Directory to save downloaded files')
+    parser.add_argument('--workers', type=_positive_int, default=DEFAULT_WORKERS,
+                        help='Maximum number of concurrent downloads')
+    parser.add_argument('--verbose', action='store_true', help='Also report skipped files')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Stay connected and serve --download commands from other invocations')
+    parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET_PATH,
+                        help='Unix socket used by --daemon')
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('telethon').setLevel(logging.WARNING)
+    if args.verbose:
+        log.setLevel(logging.DEBUG)
+    
+    # Hand downloads to a running daemon, which is already connected
+    if args.download and args.entity_id and not args.daemon:
+        response = await _send_to_daemon(args.socket, {
+            'cmd': 'download',
+            'entity_id': args.entity_id,
+            'media_type': args.media_type,
+            'limit': None if args.limit == 0 else args.limit,
+            'days': args.days,
+            'contains': args.contains,
+            'workers': args.workers,
+            'download_dir': os.path.abspath(args.download_dir),
+            'verbose': args.verbose
+        })
+        if response is not None:
+            if response.get('ok'):
+                print("Download finished by the daemon (see its output for details).")
+            else:
+                print(f"Error from daemon: {response.get('error')}")
+            return
+    
     # Check if API credentials are set
     if not all([API_ID, API_HASH, PHONE_NUMBER]):
         print("Error: API credentials not found. Please set TELEGRAM_API_ID, TELEGRAM_API_HASH, "
@@ -274,7 +1051,13 @@ async def main():
         # Connect to Telegram
         await downloader.connect()
         
-        if args.list:
+        if args.daemon:
+            if not hasattr(socket, 'AF_UNIX'):
+                print("Error: --daemon requires Unix domain socket support.")
+                return
+            await downloader.serve(args.socket)
+        
+        elif args.list:
             # List available groups/channels
             await downloader.list_dialogs()
         
@@ -293,14 +1076,16 @@ async def main():
             # Convert limit of 0 to None for unlimited downloads
             actual_limit = None if args.limit == 0 else args.limit
             
-            # Download media
-            await downloader.download_media(
-                entity_id=args.entity_id,
-                media_type=args.media_type,
-                limit=actual_limit,
-                offset_date=offset_date,
-                contains=args.contains
-            )
+            # Download media, keeping log output from breaking the progress bar
+            with logging_redirect_tqdm():
+                await downloader.download_media(
+                    entity_id=args.entity_id,
+                    media_type=args.media_type,
+                    limit=actual_limit,
+                    offset_date=offset_date,
+                    contains=args.contains,
+                    workers=args.workers
+                )
         
         else:
             # No action specified, show help
@@ -311,6 +1096,13 @@ async def main():
         await downloader.close()
 
 if __name__ == '__main__':
+    # Use the faster libuv-based event loop where available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt: